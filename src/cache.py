@@ -0,0 +1,58 @@
+import os
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+CACHE_DIR = '.cache'
+ONE_DAY = 24 * 60 * 60
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_CLOSE_HOUR = 16
+
+def trading_day(now=None):
+    """
+    Returns the US trading session (as 'YYYY-MM-DD') that data fetched at
+    `now` belongs to. The session rolls over at the 16:00 New York close and
+    skips weekends, so a cache key containing it expires at the next close.
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    if now.hour >= MARKET_CLOSE_HOUR:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.isoformat()
+
+class FileCache:
+    """
+    Pickle-backed key/value store on local disk.
+    A key is a tuple of strings, stored at <root>/<part>/.../<last part>.pkl.
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key) + '.pkl'
+
+    def get(self, key, ttl_seconds):
+        """Returns the cached value, or None if it is missing or older than ttl_seconds."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl_seconds:
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, value):
+        """Stores value under key, replacing the file atomically."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
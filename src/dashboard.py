@@ -1,6 +1,8 @@
 
 import streamlit as st
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import db_manager as db
 import matplotlib.pyplot as plt
 import os
@@ -11,17 +13,33 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data(ttl=3600)
-def load_data():
-    """Loads the cached analytics data from the database."""
-    if not os.path.exists('data/options.db'):
-        return None
-        
-    df = db.load_from_db("SELECT * FROM analytics_data")
-    return df
+def _mtime(path):
+    """The file's modification time, or None if it does not exist."""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+@st.cache_resource(max_entries=1)
+def load_tables(data_version):
+    """
+    Loads the latest analytics snapshot and its ATM term structure from their
+    Parquet mirrors as pyarrow Tables. The Tables are shared across sessions;
+    data_version (both files' mtimes) reloads them whenever run_analysis
+    rewrites either file. The term structure is None for analytics that
+    predate it.
+    """
+    term_table = pq.read_table(db.TERM_STRUCTURE_PARQUET_PATH) if data_version[1] is not None else None
+    return pq.read_table(db.ANALYTICS_PARQUET_PATH), term_table
+
+def load_ticker_data(table, ticker):
+    """Converts only the selected ticker's rows of the Table to pandas."""
+    return table.filter(pc.equal(table['ticker'], ticker)).to_pandas()
 
-def plot_volatility_smile(data_df, ticker):
-    ticker_data = data_df[data_df['ticker'] == ticker].dropna(subset=['calc_iv', 'K'])
+@st.cache_data(max_entries=32)
+def plot_volatility_smile(_data_df, ticker, data_version):
+    """
+    Builds the smile figure. Cached on (ticker, data_version) only; the
+    leading underscore keeps Streamlit from hashing the DataFrame.
+    """
+    ticker_data = _data_df.dropna(subset=['calc_iv', 'K'])
     if ticker_data.empty:
         st.warning(f"No analytics data found for {ticker}.")
         return None
@@ -33,18 +51,23 @@ def plot_volatility_smile(data_df, ticker):
     fig.suptitle(f'Volatility Smile for {ticker} (IV vs. Strike)', fontsize=20)
     ax_list = axes.flatten()
 
+    # Split calls/puts once; each panel then only filters by expiration.
+    call_mask = ticker_data['type'].to_numpy() == 'call'
+    all_calls = ticker_data[call_mask]
+    all_puts = ticker_data[~call_mask]
+
     for i, exp_date in enumerate(expirations_to_plot):
         if i >= len(ax_list): break
         ax = ax_list[i]
-        exp_data = ticker_data[ticker_data['expiration'] == exp_date]
-        calls = exp_data[exp_data['type'] == 'call']
+        calls = all_calls[all_calls['expiration'].to_numpy() == exp_date]
         ax.scatter(calls['K'], calls['calc_iv'] * 100, label='Calls', alpha=0.7)
-        puts = exp_data[exp_data['type'] == 'put']
+        puts = all_puts[all_puts['expiration'].to_numpy() == exp_date]
         ax.scatter(puts['K'], puts['calc_iv'] * 100, label='Puts', alpha=0.7)
-        S = exp_data['S'].iloc[0]
+        first = calls.iloc[0] if not calls.empty else puts.iloc[0]
+        S = first['S']
         ax.axvline(S, color='red', linestyle='--', label=f'Stock Price (${S:.2f})')
         exp_str = pd.to_datetime(exp_date).strftime('%Y-%m-%d')
-        T_str = exp_data['T'].iloc[0]
+        T_str = first['T']
         ax.set_title(f'Expiration: {exp_str} (T={T_str:.3f} yrs)')
         ax.set_xlabel('Strike Price (K)')
         ax.set_ylabel('Implied Volatility (%)')
@@ -52,10 +75,16 @@ def plot_volatility_smile(data_df, ticker):
         ax.grid(True)
 
     plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    plt.close(fig)
     return fig
 
-def plot_term_structure(data_df, ticker):
-    ticker_data = data_df[data_df['ticker'] == ticker].dropna(subset=['calc_iv', 'T'])
+@st.cache_data(max_entries=32)
+def plot_term_structure(_data_df, _term_df, ticker, data_version):
+    """
+    Builds the term structure figure, cached like plot_volatility_smile.
+    _term_df is the ticker's precomputed average ATM IV by T, or None.
+    """
+    ticker_data = _data_df.dropna(subset=['calc_iv', 'T'])
     if ticker_data.empty:
         st.warning(f"No analytics data found for {ticker}.")
         return None
@@ -67,46 +96,53 @@ def plot_term_structure(data_df, ticker):
         return None
         
     fig, ax = plt.subplots(figsize=(12, 7))
-    calls = atm_data[atm_data['type'] == 'call']
+    call_mask = atm_data['type'].to_numpy() == 'call'
+    calls = atm_data[call_mask]
     ax.scatter(calls['T'], calls['calc_iv'] * 100, label='ATM Calls', alpha=0.7)
-    puts = atm_data[atm_data['type'] == 'put']
+    puts = atm_data[~call_mask]
     ax.scatter(puts['T'], puts['calc_iv'] * 100, label='ATM Puts', alpha=0.7)
-    avg_iv_by_T = atm_data.groupby('T')['calc_iv'].mean()
-    ax.plot(avg_iv_by_T.index, avg_iv_by_T.values * 100, color='red', linestyle='--', label='Average IV')
+    if _term_df is not None and not _term_df.empty:
+        ax.plot(_term_df['T'], _term_df['calc_iv'] * 100, color='red', linestyle='--', label='Average IV')
     ax.set_title(f'Volatility Term Structure for {ticker} (ATM Options)', fontsize=18)
     ax.set_xlabel('Time to Expiration (T) in Years')
     ax.set_ylabel('Implied Volatility (%)')
     ax.legend()
     ax.grid(True)
+    plt.close(fig)
     return fig
 
 
 st.title("📈 Options Pricing & Analytics Dashboard")
 
-data = load_data()
-
-if data is None:
-    st.error("Database not found. Please run the pipeline first: python src/run_pipeline.py")
+if not os.path.exists(db.ANALYTICS_PARQUET_PATH):
+    st.error("Analytics data not found. Please run the pipeline and analysis first: "
+             "python src/run_pipeline.py && python src/run_analysis.py --action=calculate")
 else:
+    data_version = (_mtime(db.ANALYTICS_PARQUET_PATH), _mtime(db.TERM_STRUCTURE_PARQUET_PATH))
+    table, term_table = load_tables(data_version)
+
     st.header("Implied Volatility Analysis")
     
     st.sidebar.header("User Inputs")
-    available_tickers = sorted(data['ticker'].unique())
+    available_tickers = sorted(pc.unique(table['ticker']).to_pylist())
     selected_ticker = st.sidebar.selectbox(
         "Select Ticker:",
         available_tickers,
         index=available_tickers.index('SPY') 
     )
 
+    data = load_ticker_data(table, selected_ticker)
+    term_data = load_ticker_data(term_table, selected_ticker) if term_table is not None else None
+
     st.subheader(f"Volatility Smile for {selected_ticker}")
-    smile_fig = plot_volatility_smile(data, selected_ticker)
+    smile_fig = plot_volatility_smile(data, selected_ticker, data_version)
     if smile_fig:
-        st.pyplot(smile_fig)
+        st.pyplot(smile_fig, clear_figure=True)
     
     st.subheader(f"Volatility Term Structure for {selected_ticker}")
-    term_fig = plot_term_structure(data, selected_ticker)
+    term_fig = plot_term_structure(data, term_data, selected_ticker, data_version)
     if term_fig:
-        st.pyplot(term_fig)
+        st.pyplot(term_fig, clear_figure=True)
         
     with st.expander(f"View Raw Analytics Data for {selected_ticker}"):
-        st.dataframe(data[data['ticker'] == selected_ticker].drop(columns=['ticker']))
\ No newline at end of file
+        st.dataframe(data.drop(columns=['ticker']))
\ No newline at end of file
@@ -1,36 +1,75 @@
+import threading
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from cache import FileCache, ONE_DAY, trading_day
+
+# Cap on option_chain requests in flight across all tickers, however many
+# are fetched at once; kept small to stay polite to Yahoo.
+MAX_WORKERS = 8
+_chain_slots = threading.BoundedSemaphore(MAX_WORKERS)
+
+_cache = FileCache()
+
+def _fetch_option_chain(ticker, exp):
+    """Returns ticker.option_chain(exp) as (calls, puts)."""
+    with _chain_slots:
+        opt_chain = ticker.option_chain(exp)
+    return opt_chain.calls, opt_chain.puts
 
 def fetch_options_data(ticker_symbol):
-    """Fetches all option chains for a given ticker from yfinance."""
+    """
+    Fetches all option chains for a given ticker from yfinance.
+    The finished frame is cached for the trading day as one snapshot, so a
+    rerun reuses the chains together with the spot price and timestamp they
+    were fetched with, rather than pairing old quotes with a live spot.
+    """
+    key = ('options', ticker_symbol, trading_day(), 'snapshot')
+    master_df = _cache.get(key, ONE_DAY)
+    if master_df is not None:
+        return master_df
     
     ticker = yf.Ticker(ticker_symbol)
 
+    # Loaded here, before the fan-out: option_chain() would otherwise have
+    # every worker download the expiration list itself.
     expirations = ticker.options
     
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {exp: executor.submit(_fetch_option_chain, ticker, exp) for exp in expirations}
+
     all_options_data = []
+    expiration_dates = []
+    option_types = []
+    complete = True
 
-    for exp in expirations:
+    for exp, future in futures.items():
         try:
-            opt_chain = ticker.option_chain(exp)
-            opt_chain.calls['expiration_date'] = exp
-            opt_chain.calls['option_type'] = 'call'
-            opt_chain.puts['expiration_date'] = exp
-            opt_chain.puts['option_type'] = 'put'
-            
-            all_options_data.append(opt_chain.calls)
-            all_options_data.append(opt_chain.puts)
-        
+            calls, puts = future.result()
         except Exception as e:
             print(f"Warning: Could not fetch chain for {ticker_symbol} exp {exp}. Error: {e}")
-            
+            complete = False
+            continue
+
+        if calls is None or puts is None:
+            print(f"Warning: No chain data for {ticker_symbol} exp {exp}. Skipping.")
+            complete = False
+            continue
+
+        all_options_data += [calls, puts]
+        expiration_dates += [exp, exp]
+        option_types += ['call', 'put']
 
     if not all_options_data:
         print(f"No options data found for {ticker_symbol}.")
         return pd.DataFrame() 
         
-    master_df = pd.concat(all_options_data)
+    sizes = [len(chain) for chain in all_options_data]
+    master_df = pd.concat(all_options_data, ignore_index=True, copy=False, sort=False)
+    master_df['expiration_date'] = np.repeat(expiration_dates, sizes)
+    master_df['option_type'] = np.repeat(option_types, sizes)
     master_df['ticker'] = ticker_symbol
 
     try:
@@ -45,6 +84,10 @@ def fetch_options_data(ticker_symbol):
 
     master_df['underlying_price'] = underlying_price
     master_df['fetch_timestamp'] = pd.Timestamp.now()
+
+    # Partial snapshots are not cached, so the next run retries them.
+    if complete and underlying_price is not None:
+        _cache.set(key, master_df)
     
     return master_df
 
@@ -1,30 +1,129 @@
 import sqlite3
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
 import pandas as pd
 
 DB_PATH = 'data/options.db'
+ANALYTICS_PARQUET_PATH = 'data/analytics.parquet'
+TERM_STRUCTURE_PARQUET_PATH = 'data/analytics_term_structure.parquet'
 engine = create_engine(f'sqlite:///{DB_PATH}')
 
-def save_to_db(df, table_name):
+@event.listens_for(engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Runs on every new connection: WAL journaling, relaxed fsync and a ~200 MB page cache."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-200000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def _upsert_method(pd_table, conn, keys, data_iter):
+    """to_sql insertion method: one executemany of INSERT OR REPLACE per chunk."""
+    stmt = pd_table.table.insert().prefix_with('OR REPLACE')
+    conn.execute(stmt, [dict(zip(keys, row)) for row in data_iter])
+
+def _sqlite_type(series):
+    """SQLite column type for a new column holding series."""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(series):
+        return 'REAL'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+def _add_missing_columns(conn, table_name, column_types):
+    """Adds each column in column_types ({name: SQL type}) that table_name lacks."""
+    existing = {col['name'] for col in inspect(conn).get_columns(table_name)}
+    for name, sql_type in column_types.items():
+        if name not in existing:
+            print(f"Adding column '{name}' to '{table_name}'.")
+            conn.exec_driver_sql(f'ALTER TABLE "{table_name}" ADD COLUMN "{name}" {sql_type}')
+
+def _prepare_keyed_table(conn, df, table_name, key_columns):
+    """
+    Makes table_name ready for an upsert of df on key_columns.
+    A missing table is created with that primary key. A table without it
+    (e.g. one written by a replace-mode save) is rebuilt with the key,
+    collapsing duplicate rows to the latest one, since INSERT OR REPLACE
+    would otherwise just append. Columns new in df are added.
+    """
+    if not inspect(conn).has_table(table_name):
+        conn.exec_driver_sql(pd.io.sql.get_schema(df, table_name, keys=key_columns, con=conn))
+        return
+
+    if inspect(conn).get_pk_constraint(table_name)['constrained_columns'] != list(key_columns):
+        print(f"Warning: '{table_name}' has no primary key on {key_columns}. "
+              f"Rebuilding it with one and dropping duplicate rows.")
+        old_columns = {
+            col['name']: col['type'].compile(dialect=conn.dialect)
+            for col in inspect(conn).get_columns(table_name)
+        }
+        old_table = f"{table_name}_unkeyed"
+        conn.exec_driver_sql(f'ALTER TABLE "{table_name}" RENAME TO "{old_table}"')
+        conn.exec_driver_sql(pd.io.sql.get_schema(df, table_name, keys=key_columns, con=conn))
+        _add_missing_columns(conn, table_name, old_columns)
+        columns = ', '.join(f'"{name}"' for name in old_columns)
+        conn.exec_driver_sql(
+            f'INSERT OR REPLACE INTO "{table_name}" ({columns}) SELECT {columns} FROM "{old_table}"'
+        )
+        conn.exec_driver_sql(f'DROP TABLE "{old_table}"')
+
+    _add_missing_columns(conn, table_name, {name: _sqlite_type(df[name]) for name in df.columns})
+
+def save_to_db(df, table_name, key_columns=None):
     """
     Saves a DataFrame to a table in the SQLite database.
-    Replaces the table if it already exists.
+    With key_columns, rows are upserted on that primary key (the table is
+    created or migrated to it by _prepare_keyed_table); otherwise the table
+    is replaced.
     """
     if df.empty:
         print(f"Skipping save for {table_name}: DataFrame is empty.")
         return
         
     try:
-        df.to_sql(table_name, con=engine, if_exists='replace', index=False)
+        if key_columns is None:
+            df.to_sql(table_name, con=engine, if_exists='replace', index=False)
+        else:
+            with engine.begin() as conn:
+                _prepare_keyed_table(conn, df, table_name, key_columns)
+                df.to_sql(
+                    table_name, con=conn, if_exists='append', index=False,
+                    method=_upsert_method, chunksize=10_000
+                )
         print(f"Successfully saved {len(df)} rows to '{table_name}' in {DB_PATH}")
     except Exception as e:
         print(f"Error saving to database: {e}")
 
-def load_from_db(query):
-    """Loads data from the database using a SQL query."""
+def save_to_parquet(df, path):
+    """
+    Writes a DataFrame to a zstd-compressed Parquet file, replacing it.
+    Used as a columnar read-side mirror of database tables.
+    """
+    if df.empty:
+        print(f"Skipping save for {path}: DataFrame is empty.")
+        return
+
+    try:
+        df.to_parquet(path, compression='zstd', index=False)
+        print(f"Successfully saved {len(df)} rows to {path}")
+    except Exception as e:
+        print(f"Error saving to Parquet: {e}")
+
+def load_from_db(query, params=None, chunksize=None):
+    """
+    Loads data from the database using a SQL query.
+    params are bound to the query's '?' placeholders. With chunksize, rows are
+    streamed from the cursor in chunks of that many rows and concatenated,
+    instead of being fetched all at once.
+    """
     try:
         with engine.connect() as conn:
-            return pd.read_sql(query, con=conn)
+            if chunksize is None:
+                return pd.read_sql(query, con=conn, params=params)
+            chunks = pd.read_sql(query, con=conn, params=params, chunksize=chunksize)
+            return pd.concat(chunks, ignore_index=True, copy=False)
     except Exception as e:
         print(f"Error loading from database: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
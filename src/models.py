@@ -1,13 +1,51 @@
 
 
 import numpy as np
-from scipy.stats import norm
+from numba import njit
+from scipy.special import ndtr
+from py_lets_be_rational import normalised_implied_volatility_from_a_transformed_rational_guess
+from py_lets_be_rational.exceptions import VolatilityValueException
+
+try:
+    import cupy as cp
+    from cupyx.scipy.special import ndtr as _cp_ndtr
+except ImportError:
+    cp = None
 
 #1. Core BSM Pricer
 
+_INV_SQRT_2PI = 0.3989422804014327  # 1 / sqrt(2*pi)
+
+def _norm_pdf(x, xp=np):
+    """Standard normal density, written out instead of going through scipy.stats.norm."""
+    return xp.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+def _ndtr(x, xp=np):
+    """Standard normal CDF on the array module's device (NumPy or CuPy)."""
+    return ndtr(x) if xp is np else _cp_ndtr(x)
+
+def _is_call(option_type):
+    """Boolean mask that is True where option_type is 'call'."""
+    option_type = np.asarray(option_type)
+    is_call = option_type == 'call'
+    if not np.all(is_call | (option_type == 'put')):
+        raise ValueError("option_type must be 'call' or 'put'")
+    return is_call
+
+def _sign(is_call, dtype, xp=np):
+    """+1 for calls and -1 for puts, in dtype so float32 inputs stay float32."""
+    return xp.where(is_call, 1.0, -1.0).astype(dtype, copy=False)
+
+def _d1_d2(log_sk, T, r, sigma, sqrtT):
+    """BSM d1 and d2 from a precomputed log(S/K) and sqrt(T)."""
+    vs = sigma * sqrtT
+    d1 = (log_sk + (r + 0.5 * sigma * sigma) * T) / vs
+    return d1, d1 - vs
+
 def bsm_price(S, K, T, r, sigma, option_type='call'):
     """
     Calculates the Black-Scholes-Merton price for a European option.
+    All inputs may be scalars or NumPy arrays and are broadcast together.
     
     :param S: Current stock price
     :param K: Strike price
@@ -18,122 +56,238 @@ def bsm_price(S, K, T, r, sigma, option_type='call'):
     :return: Price of the option
     """
     
-    if T <= 0:
-        if option_type == 'call':
-            return max(0.0, S - K)
-        elif option_type == 'put':
-            return max(0.0, K - S)
-    
-    if sigma <= 0:
-        sigma = 1e-6
+    is_call = _is_call(option_type)
 
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
+    T = np.asarray(T)
+    expired = T <= 0
+    T = np.where(expired, 1.0, T)
+    sigma = np.where(np.asarray(sigma) <= 0, 1e-6, sigma)
+
+    sqrtT = np.sqrt(T)
+    d1, d2 = _d1_d2(np.log(S / K), T, r, sigma, sqrtT)
+    disc = np.exp(-r * T)
+    w = _sign(is_call, d1.dtype)
     
-    if option_type == 'call':
-        price = (S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2))
-    elif option_type == 'put':
-        price = (K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1))
-    else:
-        raise ValueError("option_type must be 'call' or 'put'")
+    price = w * (S * ndtr(w * d1) - K * disc * ndtr(w * d2))
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
         
-    return price
+    return np.where(expired, intrinsic, price)[()]
 
 #2. The Greeks
 
-def bsm_greeks(S, K, T, r, sigma, option_type='call'):
+def _bsm_greeks_core(S, K, T, r, sigma, d1, d2, sqrtT, disc, pdf_d1, is_call):
     """
-    Calculates the BSM Greeks for a European option.
+    Combines precomputed d1, d2, sqrt(T), exp(-r*T) and pdf(d1) into the Greeks.
+    Only the two CDF values are evaluated here.
     """
+    w = _sign(is_call, d1.dtype)
     
-    if T <= 0:
-        return {'delta': 0, 'gamma': 0, 'vega': 0, 'theta': 0, 'rho': 0}
-
-    if sigma <= 0:
-        sigma = 1e-6
-
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    
-    pdf_d1 = norm.pdf(d1)
+    Nd1 = ndtr(d1)
+    Nwd2 = ndtr(w * d2)
     
     greeks = {}
 
-    greeks['gamma'] = pdf_d1 / (S * sigma * np.sqrt(T))
+    greeks['gamma'] = pdf_d1 / (S * sigma * sqrtT)
     
-    greeks['vega'] = (S * pdf_d1 * np.sqrt(T)) * 0.01
+    greeks['vega'] = (S * pdf_d1 * sqrtT) * 0.01
 
-    if option_type == 'call':
-        greeks['delta'] = norm.cdf(d1)
-        greeks['theta'] = (-(S * pdf_d1 * sigma) / (2 * np.sqrt(T)) - r * K * np.exp(-r * T) * norm.cdf(d2)) / 365.25
-        greeks['rho'] = (K * T * np.exp(-r * T) * norm.cdf(d2)) * 0.01
-    
-    elif option_type == 'put':
-        greeks['delta'] = norm.cdf(d1) - 1
-        greeks['theta'] = (-(S * pdf_d1 * sigma) / (2 * np.sqrt(T)) + r * K * np.exp(-r * T) * norm.cdf(-d2)) / 365.25
-        greeks['rho'] = (-K * T * np.exp(-r * T) * norm.cdf(-d2)) * 0.01
-    
-    else:
-        raise ValueError("option_type must be 'call' or 'put'")
+    greeks['delta'] = np.where(is_call, Nd1, Nd1 - 1)
+    greeks['theta'] = (-(S * pdf_d1 * sigma) / (2 * sqrtT) - w * r * K * disc * Nwd2) / 365.25
+    greeks['rho'] = (w * K * T * disc * Nwd2) * 0.01
         
     return greeks
 
-#3. Implied Volatility (IV) Solver
-
-def implied_volatility(market_price, S, K, T, r, option_type='call', max_iter=100, tolerance=1e-6):
+def bsm_greeks(S, K, T, r, sigma, option_type='call'):
     """
-    Calculates the implied volatility (IV) using the Newton-Raphson method.
-    
-    Finds the 'sigma' that makes the BSM price equal to the market price.
+    Calculates the BSM Greeks for a European option.
+    Each Greek is a scalar or an array matching the broadcast inputs.
     """
-    sigma = 0.5
     
-    for i in range(max_iter):
+    is_call = _is_call(option_type)
 
-        price_guess = bsm_price(S, K, T, r, sigma, option_type)
-        
+    T = np.asarray(T)
+    expired = T <= 0
+    T = np.where(expired, 1.0, T)
+    sigma = np.where(np.asarray(sigma) <= 0, 1e-6, sigma)
 
-        greeks = bsm_greeks(S, K, T, r, sigma, option_type)
-        
-        vega = greeks['vega'] / 0.01 
+    sqrtT = np.sqrt(T)
+    d1, d2 = _d1_d2(np.log(S / K), T, r, sigma, sqrtT)
+    greeks = _bsm_greeks_core(S, K, T, r, sigma, d1, d2, sqrtT, np.exp(-r * T), _norm_pdf(d1), is_call)
         
+    return {name: np.where(expired, 0.0, value)[()] for name, value in greeks.items()}
+
+#3. Implied Volatility (IV) Solver
+
+_NEWTON_MAX_ITER = 100
+_NEWTON_TOLERANCE = 1e-6
+
+def _normalised_implied_volatility(beta, x, q):
+    """Jäckel's sigma*sqrt(T) for one normalised quote, or NaN if no volatility reproduces it."""
+    try:
+        return normalised_implied_volatility_from_a_transformed_rational_guess(beta, x, q)
+    except VolatilityValueException:
+        return np.nan
+
+_normalised_implied_volatility_vec = np.frompyfunc(_normalised_implied_volatility, 3, 1)
+
+def _price_and_vega(S, K, T, r, sigma, is_call, log_sk, sqrtT, disc, xp=np):
+    """
+    BSM price and raw vega (per unit of sigma) from a single d1/d2 evaluation.
+    log(S/K), sqrt(T) and exp(-r*T) do not depend on sigma, so callers
+    iterating on sigma pass them in precomputed. xp is the array module
+    (NumPy, or CuPy for GPU arrays).
+    """
+    d1, d2 = _d1_d2(log_sk, T, r, sigma, sqrtT)
+    w = _sign(is_call, d1.dtype, xp)
+
+    price = w * (S * _ndtr(w * d1, xp) - K * disc * _ndtr(w * d2, xp))
+    vega = S * sqrtT * _norm_pdf(d1, xp)
+    return price, vega
 
+def _implied_volatility_newton(market_price, S, K, T, r, is_call, xp=np):
+    """
+    Newton-Raphson fallback for quotes the rational approximation cannot solve.
+    Takes 1-D arrays and steps every unsolved quote at once; quotes are
+    retired from the working arrays as soon as they converge, so later
+    iterations only touch the stragglers. Options that fail to converge
+    are returned as NaN. Works in the dtype of market_price; for float32
+    the price tolerance is widened to what single precision can resolve.
+    """
+    result = xp.full(market_price.shape, np.nan, dtype=market_price.dtype)
+    idx = xp.arange(result.size)
+    tolerance = xp.maximum(_NEWTON_TOLERANCE, 8 * np.finfo(market_price.dtype).eps * S)
+    log_sk = xp.log(S / K)
+    sqrtT = xp.sqrt(T)
+    disc = xp.exp(-r * T)
+    # Manaster-Kohler start: the inflection point of price in sigma, from
+    # which Newton-Raphson converges monotonically.
+    sigma = xp.clip(xp.sqrt(xp.maximum(xp.abs(log_sk + r * T), 1e-6) * 2.0 / T), 0.05, 3.0)
+    
+    for i in range(_NEWTON_MAX_ITER):
+
+        price_guess, vega = _price_and_vega(S, K, T, r, sigma, is_call, log_sk, sqrtT, disc, xp)
         price_diff = price_guess - market_price
         
-        if abs(price_diff) < tolerance:
-            return sigma
-            
-        
-        if vega == 0:
-            sigma = sigma * 0.99
-            continue
+        done = xp.abs(price_diff) < tolerance
+        if done.any():
+            result[idx[done]] = sigma[done]
+            active = ~done
+            idx, market_price, S, K, T, r, is_call, log_sk, sqrtT, disc, sigma, price_diff, vega, tolerance = (
+                a[active] for a in
+                (idx, market_price, S, K, T, r, is_call, log_sk, sqrtT, disc, sigma, price_diff, vega, tolerance)
+            )
+            if idx.size == 0:
+                break
             
-        sigma = sigma - price_diff / vega
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton_step = xp.clip(sigma - price_diff / vega, 1e-3, 5)
 
-        if sigma < 1e-3:
-            sigma = 1e-3
-        elif sigma > 5:
-            sigma = 5
+        sigma = xp.where(vega == 0, sigma * 0.99, newton_step)
 
-    return None
+    return result
 
-#4. CRR Binomial Tree Pricer
+def _implied_volatility_jaeckel(market_price, S, K, T, r, is_call):
+    """
+    Peter Jäckel's "Let's Be Rational" on 1-D arrays of live (T > 0) quotes.
+    The quote is normalised to the undiscounted Black price
+    beta = market_price * exp(r*T) / sqrt(F*K) with log-moneyness
+    x = log(F/K), F = S*exp(r*T), and the rational approximation returns
+    v = sigma*sqrt(T) to machine precision in at most two iterations.
+    It runs in double precision, one quote at a time in Python; the result
+    is cast back to the dtype of market_price, with NaN where no volatility
+    reproduces the quote.
+    """
+    price64, S64, K64, T64, r64 = (
+        a.astype(np.float64, copy=False) for a in (market_price, S, K, T, r)
+    )
 
-def crr_binomial_pricer(S, K, T, r, sigma, N, option_type='call', exercise_style='european'):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.exp(r64 * T64)
+        forward = S64 * growth
+        beta = price64 * growth / np.sqrt(forward * K64)
+        x = np.log(forward / K64)
+        # Missing inputs (e.g. no underlying price) make beta or x NaN, which
+        # the rational approximation raises on; such quotes stay NaN.
+        solvable = np.isfinite(beta) & np.isfinite(x)
+        v = np.full(beta.shape, np.nan)
+        v[solvable] = _normalised_implied_volatility_vec(
+            beta[solvable], x[solvable], _sign(is_call[solvable], np.float64)
+        ).astype(float)
+
+    return (v / np.sqrt(T64)).astype(market_price.dtype)
+
+_IV_METHODS = {'newton': _implied_volatility_newton, 'jaeckel': _implied_volatility_jaeckel}
+
+def implied_volatility(market_price, S, K, T, r, option_type='call', method='newton'):
     """
-    Calculates the option price using the Cox-Ross-Rubinstein (CRR) binomial tree.
+    Calculates the implied volatility (IV).
     
-    :param S: Current stock price
-    :param K: Strike price
-    :param T: Time to expiration (in years)
-    :param r: Risk-free interest rate
-    :param sigma: Volatility (annualized)
-    :param N: Number of steps in the binomial tree (e.g., 100)
-    :param option_type: 'call' or 'put'
-    :param exercise_style: 'european' or 'american'
-    :return: Price of the option
+    Finds the 'sigma' that makes the BSM price equal to the market price.
+    With method='newton' (the default) every quote is solved at once by the
+    batched Newton-Raphson iteration, in the inputs' dtype; the few quotes
+    it cannot solve are retried with Jäckel's "Let's Be Rational".
+    method='jaeckel' runs the rational approximation on every quote first,
+    which is exact to machine precision but loops over quotes in Python, so
+    it suits single-option accuracy checks rather than whole universes.
+    Expired quotes, quotes with missing inputs and quotes neither method
+    can solve (e.g. a price below intrinsic value) are returned as NaN.
+    The result has the inputs' dtype, so float32 quotes give float32 IVs.
     """
+    if method not in _IV_METHODS:
+        raise ValueError("method must be 'newton' or 'jaeckel'")
+
+    is_call = _is_call(option_type)
+    shape = np.broadcast(market_price, S, K, T, r, is_call).shape
+    market_price, S, K, T, r, is_call = (
+        np.broadcast_to(a, shape).ravel() for a in (market_price, S, K, T, r, is_call)
+    )
+    dtype = np.result_type(market_price, S, K, T, r, np.float32)
+    market_price, S, K, T, r = (a.astype(dtype, copy=False) for a in (market_price, S, K, T, r))
+
+    sigma = np.full(market_price.shape, np.nan, dtype=dtype)
+    live = (T > 0) & np.isfinite(market_price) & np.isfinite(S) & np.isfinite(K) & np.isfinite(r)
+    first, retry = _IV_METHODS[method], _IV_METHODS['jaeckel' if method == 'newton' else 'newton']
+
+    for solve in (first, retry):
+        unsolved = live & np.isnan(sigma)
+        if unsolved.any():
+            sigma[unsolved] = solve(
+                market_price[unsolved], S[unsolved], K[unsolved], T[unsolved], r[unsolved],
+                is_call[unsolved]
+            )
+
+    return sigma.reshape(shape)[()]
+
+def implied_volatility_gpu(market_price, S, K, T, r, option_type='call'):
+    """
+    Calculates implied volatility on a CUDA GPU via CuPy, for option universes
+    large enough that the CPU solve is memory-bandwidth bound.
     
+    The quotes are copied to the device once and solved together with the
+    batched Newton-Raphson iteration; the result is copied back as a NumPy
+    array, with NaN where the solver did not converge or the option has
+    expired, as in implied_volatility.
+    """
+    if cp is None:
+        raise ImportError("implied_volatility_gpu requires CuPy (e.g. pip install cupy-cuda12x)")
+
+    is_call = _is_call(option_type)
+    shape = np.broadcast(market_price, S, K, T, r, is_call).shape
+    market_price, S, K, T, r, is_call = (
+        cp.asarray(np.broadcast_to(a, shape).ravel()) for a in (market_price, S, K, T, r, is_call)
+    )
+    live = T > 0
+    sigma = cp.full(market_price.shape, np.nan, dtype=market_price.dtype)
+    sigma[live] = _implied_volatility_newton(
+        market_price[live], S[live], K[live], T[live], r[live], is_call[live], xp=cp
+    )
+    return cp.asnumpy(sigma).reshape(shape)[()]
+
+#4. CRR Binomial Tree Pricer
+
+@njit(fastmath=True, cache=True)
+def _crr(S, K, T, r, sigma, N, is_call, is_american):
+    """Compiled CRR backward induction over a single reused value buffer."""
 
     dt = T / N 
     u = np.exp(sigma * np.sqrt(dt))
@@ -143,38 +297,66 @@ def crr_binomial_pricer(S, K, T, r, sigma, N, option_type='call', exercise_style
     discount = np.exp(-r * dt)
 
     #2. Build the Stock Price Tree (Forward)
-    stock_prices_at_expiry = np.zeros(N + 1)
-    for i in range(N + 1):
-        stock_prices_at_expiry[i] = S * (u**(N - i)) * (d**i)
+    # Node i at expiry is S*u^(N-2i); each extra down-move scales by d/u = d*d,
+    # so a single pow seeds the top node and the rest are multiplications.
+    d_over_u = d * d
+    stock = np.empty(N + 1)
+    stock[0] = S * u**N
+    for i in range(1, N + 1):
+        stock[i] = stock[i - 1] * d_over_u
 
     #3. Calculate Option Value at Expiration (Backward)
-    option_values = np.zeros(N + 1)
-    if option_type == 'call':
-        option_values = np.maximum(0, stock_prices_at_expiry - K)
-    elif option_type == 'put':
-        option_values = np.maximum(0, K - stock_prices_at_expiry)
+    values = np.empty(N + 1)
+    for i in range(N + 1):
+        if is_call:
+            values[i] = max(0.0, stock[i] - K)
+        else:
+            values[i] = max(0.0, K - stock[i])
 
     #4. Work Backward Through the Tree
+    # values[i + 1] is still from the later step when values[i] is
+    # overwritten, so one buffer holds every level of the tree.
+    # Discounting is folded into the branch weights once, outside the loops.
+    disc_p_up = discount * p
+    disc_p_down = discount * (1 - p)
     for step in range(N - 1, -1, -1):
-        new_option_values = np.zeros(step + 1)
-        
         for i in range(step + 1):
-            expected_value = discount * (p * option_values[i] + (1 - p) * option_values[i + 1])
-            
-            if exercise_style == 'european':
-                new_option_values[i] = expected_value
+            values[i] = disc_p_up * values[i] + disc_p_down * values[i + 1]
             
-            elif exercise_style == 'american':
+            if is_american:
+                # One step back in time is one fewer up-move: S*u^(step-2i).
+                stock[i] = stock[i] * d
                 
-                current_stock_price = S * (u**(step - i)) * (d**i)
-                
-                if option_type == 'call':
-                    intrinsic_value = max(0.0, current_stock_price - K)
-                elif option_type == 'put':
-                    intrinsic_value = max(0.0, K - current_stock_price)
+                if is_call:
+                    intrinsic_value = max(0.0, stock[i] - K)
+                else:
+                    intrinsic_value = max(0.0, K - stock[i])
                     
-                new_option_values[i] = max(expected_value, intrinsic_value)
-                
-        option_values = new_option_values
+                values[i] = max(values[i], intrinsic_value)
+
+    return values[0]
+
+def crr_binomial_pricer(S, K, T, r, sigma, N, option_type='call', exercise_style='european'):
+    """
+    Calculates the option price using the Cox-Ross-Rubinstein (CRR) binomial tree.
+    
+    :param S: Current stock price
+    :param K: Strike price
+    :param T: Time to expiration (in years)
+    :param r: Risk-free interest rate
+    :param sigma: Volatility (annualized)
+    :param N: Number of steps in the binomial tree (e.g., 100)
+    :param option_type: 'call' or 'put'
+    :param exercise_style: 'european' or 'american'
+    :return: Price of the option
+    """
+    
+    if option_type not in ('call', 'put'):
+        raise ValueError("option_type must be 'call' or 'put'")
+    if exercise_style not in ('european', 'american'):
+        raise ValueError("exercise_style must be 'european' or 'american'")
 
-    return option_values[0]
\ No newline at end of file
+    return _crr(
+        float(S), float(K), float(T), float(r), float(sigma), int(N),
+        option_type == 'call', exercise_style == 'american'
+    )
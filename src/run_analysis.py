@@ -1,20 +1,26 @@
 
 import db_manager as db
 import models as m
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
 import matplotlib.pyplot as plt
 import argparse 
+import os
 import warnings
 
 
 def calculate_and_cache_analytics():
     """
-    Loads all 'curated_options', calculates IV and Greeks for each,
-    and saves the results to a new table 'analytics_data'.
+    Loads the latest 'curated_options' snapshot of each ticker, calculates
+    IV and Greeks for each option, and upserts the results into 'analytics_data'.
     """
     print("Loading data from 'curated_options'...")
-    options_df = db.load_from_db("SELECT * FROM curated_options")
+    options_df = db.load_from_db("""
+    SELECT ticker, S, K, T, r, type, market_price, volume, open_interest,
+           market_iv, expiration, fetched_at, contract_symbol
+    FROM curated_options AS c
+    WHERE fetched_at = (SELECT MAX(fetched_at) FROM curated_options WHERE ticker = c.ticker)
+    """, chunksize=50_000)
     
     if options_df.empty:
         print("No data in 'curated_options'. Run pipeline first.")
@@ -22,56 +28,47 @@ def calculate_and_cache_analytics():
 
     warnings.filterwarnings('ignore')
 
-    implied_vols = []
-    deltas = []
-    gammas = []
-    vegas = []
-    thetas = []
-
     print(f"Calculating analytics for {len(options_df)} options...")
-    
-    for index, row in tqdm(options_df.iterrows(), total=options_df.shape[0]):
-        
-        iv = m.implied_volatility(
-            market_price=row['market_price'],
-            S=row['S'],
-            K=row['K'],
-            T=row['T'],
-            r=row['r'],
-            option_type=row['type']
-        )
-        
-        if iv is not None and iv > 0:
-            implied_vols.append(iv)
-            
-            greeks = m.bsm_greeks(
-                S=row['S'],
-                K=row['K'],
-                T=row['T'],
-                r=row['r'],
-                sigma=iv,
-                option_type=row['type']
-            )
-            deltas.append(greeks['delta'])
-            gammas.append(greeks['gamma'])
-            vegas.append(greeks['vega'])
-            thetas.append(greeks['theta'])
-        else:
-            implied_vols.append(None)
-            deltas.append(None)
-            gammas.append(None)
-            vegas.append(None)
-            thetas.append(None)
+
+    # Single precision is ample for quotes at cent resolution and halves the
+    # memory traffic; calc_iv and the Greeks come back (and are stored) as float32.
+    S = options_df['S'].to_numpy(dtype=np.float32)
+    K = options_df['K'].to_numpy(dtype=np.float32)
+    T = options_df['T'].to_numpy(dtype=np.float32)
+    r = options_df['r'].to_numpy(dtype=np.float32)
+    option_type = options_df['type'].to_numpy()
+
+    # USE_GPU=1 solves the whole universe on a CUDA device (requires CuPy).
+    solve_iv = m.implied_volatility_gpu if os.environ.get('USE_GPU') == '1' else m.implied_volatility
+    iv = solve_iv(
+        market_price=options_df['market_price'].to_numpy(dtype=np.float32),
+        S=S,
+        K=K,
+        T=T,
+        r=r,
+        option_type=option_type
+    )
+    iv = np.where(iv > 0, iv, np.nan)
+
+    greeks = m.bsm_greeks(S=S, K=K, T=T, r=r, sigma=iv, option_type=option_type)
 
     print("Calculation complete. Adding to DataFrame...")
 
-    options_df['calc_iv'] = implied_vols
-    options_df['delta'] = deltas
-    options_df['gamma'] = gammas
-    options_df['vega'] = vegas
-    options_df['theta'] = thetas
+    options_df['calc_iv'] = iv
+    options_df['delta'] = greeks['delta']
+    options_df['gamma'] = greeks['gamma']
+    options_df['vega'] = greeks['vega']
+    options_df['theta'] = greeks['theta']
+
+    db.save_to_db(options_df, 'analytics_data', key_columns=['ticker', 'fetched_at', 'contract_symbol'])
 
-    db.save_to_db(options_df, 'analytics_data')
+    # Precompute the ATM term structure so plots load it instead of grouping on every read.
+    atm_mask = (options_df['K'] > options_df['S'] * 0.9) & (options_df['K'] < options_df['S'] * 1.1)
+    atm_term = options_df[atm_mask].groupby(['ticker', 'T'])['calc_iv'].mean().dropna().reset_index()
+    db.save_to_db(atm_term, 'analytics_term_structure')
+    db.save_to_parquet(atm_term, db.TERM_STRUCTURE_PARQUET_PATH)
+
+    db.save_to_parquet(options_df, db.ANALYTICS_PARQUET_PATH)
     
     print(f"Successfully cached {len(options_df)} rows to 'analytics_data'.")
     return options_df
@@ -104,21 +101,26 @@ def plot_volatility_smile(data_df, ticker):
     
     ax_list = axes.flatten()
 
+    # Split calls/puts once; each panel then only filters by expiration.
+    call_mask = ticker_data['type'].to_numpy() == 'call'
+    all_calls = ticker_data[call_mask]
+    all_puts = ticker_data[~call_mask]
+
     for i, exp_date in enumerate(expirations_to_plot):
         if i >= len(ax_list): break
         
         ax = ax_list[i]
-        exp_data = ticker_data[ticker_data['expiration'] == exp_date]
 
-        calls = exp_data[exp_data['type'] == 'call']
+        calls = all_calls[all_calls['expiration'].to_numpy() == exp_date]
         ax.scatter(calls['K'], calls['calc_iv'] * 100, label='Calls', alpha=0.7)
-        puts = exp_data[exp_data['type'] == 'put']
+        puts = all_puts[all_puts['expiration'].to_numpy() == exp_date]
         ax.scatter(puts['K'], puts['calc_iv'] * 100, label='Puts', alpha=0.7)
-        S = exp_data['S'].iloc[0]
+        first = calls.iloc[0] if not calls.empty else puts.iloc[0]
+        S = first['S']
         ax.axvline(S, color='red', linestyle='--', label=f'Stock Price (${S:.2f})')
         
         exp_str = pd.to_datetime(exp_date).strftime('%Y-%m-%d')
-        T_str = exp_data['T'].iloc[0]
+        T_str = first['T']
         ax.set_title(f'Expiration: {exp_str} (T={T_str:.3f} yrs)')
         ax.set_xlabel('Strike Price (K)')
         ax.set_ylabel('Implied Volatility (%)')
@@ -154,17 +156,23 @@ def plot_term_structure(data_df, ticker):
         
     plt.figure(figsize=(12, 7))
 
-    calls = atm_data[atm_data['type'] == 'call']
+    call_mask = atm_data['type'].to_numpy() == 'call'
+    calls = atm_data[call_mask]
     plt.scatter(calls['T'], calls['calc_iv'] * 100, label='ATM Calls', alpha=0.7)
-    puts = atm_data[atm_data['type'] == 'put']
+    puts = atm_data[~call_mask]
     plt.scatter(puts['T'], puts['calc_iv'] * 100, label='ATM Puts', alpha=0.7)
     
     plt.title(f'Volatility Term Structure for {ticker} (ATM Options)', fontsize=18)
     plt.xlabel('Time to Expiration (T) in Years')
     plt.ylabel('Implied Volatility (%)')
     
-    avg_iv_by_T = atm_data.groupby('T')['calc_iv'].mean()
-    plt.plot(avg_iv_by_T.index, avg_iv_by_T.values * 100, color='red', linestyle='--', label='Average IV')
+    avg_iv_by_T = db.load_from_db(
+        "SELECT T, calc_iv FROM analytics_term_structure WHERE ticker = ? ORDER BY T",
+        params=(ticker,)
+    )
+    # Empty when analytics predate the term structure table.
+    if not avg_iv_by_T.empty:
+        plt.plot(avg_iv_by_T['T'], avg_iv_by_T['calc_iv'] * 100, color='red', linestyle='--', label='Average IV')
     
     plt.legend()
     plt.grid(True)
@@ -198,10 +206,15 @@ def main():
     if args.action == 'plot' or args.action == 'all':
         if analytics_df is None:
             print("Loading cached data from 'analytics_data'...")
-            analytics_df = db.load_from_db("SELECT * FROM analytics_data")
+            analytics_df = db.load_from_db("""
+            SELECT ticker, S, K, T, type, calc_iv, expiration
+            FROM analytics_data
+            WHERE ticker = ?
+              AND fetched_at = (SELECT MAX(fetched_at) FROM analytics_data WHERE ticker = ?)
+            """, params=(args.ticker, args.ticker))
             
             if analytics_df.empty:
-                print("Cache is empty. Run with --action=calculate first.")
+                print(f"No cached analytics for {args.ticker}. Run with --action=calculate first.")
                 return
         plot_volatility_smile(analytics_df, args.ticker)
         plot_term_structure(analytics_df, args.ticker)
@@ -19,9 +19,12 @@ def run_convergence_test():
 
     bsm_call_price = m.bsm_price(S, K, T, r, sigma, option_type='call')
     print(f"BSM Price (Target): {bsm_call_price:.6f}\n")
-    N_steps = [25, 50, 100, 250, 500, 1000]
+    N_steps = [25, 50, 100, 250, 500, 1000, 5000, 10000]
     results = []
     
+    # Compile the JIT-ed tree once so the timings below measure pricing only.
+    m.crr_binomial_pricer(S, K, T, r, sigma, N=1)
+    
     print("Running CRR Model with increasing steps (N):")
     
     for n in N_steps:
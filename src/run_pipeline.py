@@ -1,14 +1,29 @@
+import numpy as np
 import pandas as pd
 import yfinance as yf
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from data_ingestion import fetch_options_data
+from cache import FileCache, ONE_DAY, trading_day
 import db_manager as db
 
+# Tickers fetched concurrently. Each fans out over its expirations, but
+# data_ingestion.MAX_WORKERS caps the chain requests in flight across all of them.
+TICKER_WORKERS = 4
+
+_cache = FileCache()
+
 def fetch_risk_free_rate():
     """
     Fetches the 10-Year Treasury yield as a proxy for 'r'.
     ^TNX is the CBOE 10-Year Treasury Note Yield index.
     """
+    key = ('rates', '^TNX', trading_day())
+    cached_r = _cache.get(key, ONE_DAY)
+    if cached_r is not None:
+        print(f"Using cached risk-free rate (10-Yr Treasury) for {key[-1]}.")
+        return cached_r
+
     try:
         tnx = yf.Ticker("^TNX")
         r_decimal = tnx.fast_info['lastPrice']
@@ -22,6 +37,7 @@ def fetch_risk_free_rate():
                 raise Exception("TNX history is empty")
         
         print(f"Raw risk-free rate (10-Yr Treasury): {r_decimal}%")
+        _cache.set(key, r_decimal / 100)
         return r_decimal / 100
     
     except Exception as e:
@@ -36,12 +52,18 @@ def create_curated_table(raw_df, risk_free_rate):
     if raw_df.empty:
         return pd.DataFrame()
         
-    curated_df = raw_df.copy()
-    curated_df['expiration_date'] = pd.to_datetime(curated_df['expiration_date'])
-    curated_df['fetch_timestamp'] = pd.to_datetime(curated_df['fetch_timestamp'])
-    time_delta = (curated_df['expiration_date'] + pd.DateOffset(days=1)) - curated_df['fetch_timestamp']
-    curated_df['T'] = time_delta.dt.total_seconds() / (365.25 * 24 * 60 * 60)
-    curated_df['r'] = risk_free_rate
+    expiration = raw_df['expiration_date'].to_numpy(dtype='datetime64[ns]')
+    fetched_at = raw_df['fetch_timestamp'].to_numpy(dtype='datetime64[ns]')
+    time_delta = (expiration + np.timedelta64(1, 'D')) - fetched_at
+    T = time_delta / np.timedelta64(1, 's') / (365.25 * 24 * 60 * 60)
+    keep = T > 0
+
+    derived_cols = {
+        'T': T,
+        'r': np.full(len(T), risk_free_rate),
+        'expiration_date': expiration,
+        'fetch_timestamp': fetched_at
+    }
     final_cols = {
         'ticker': 'ticker',
         'underlying_price': 'S',
@@ -57,11 +79,11 @@ def create_curated_table(raw_df, risk_free_rate):
         'fetch_timestamp': 'fetched_at',
         'contractSymbol': 'contract_symbol'
     }
-    cols_to_use = [col for col in final_cols.keys() if col in curated_df.columns]
-    curated_df = curated_df[cols_to_use]
-    
-    curated_df = curated_df.rename(columns=final_cols)
-    curated_df = curated_df[curated_df['T'] > 0].reset_index(drop=True)
+    curated_df = pd.DataFrame({
+        new_col: (derived_cols[col] if col in derived_cols else raw_df[col].to_numpy())[keep]
+        for col, new_col in final_cols.items()
+        if col in derived_cols or col in raw_df.columns
+    })
     
     return curated_df
 
@@ -74,9 +96,18 @@ def run_full_pipeline(tickers_list):
     print(f"Using Risk-Free Rate (r): {r:.4f}")
 
     all_raw_data = []
-    for ticker in tickers_list:
-        print(f"Fetching data for {ticker}...")
-        raw_data = fetch_options_data(ticker)
+    with ThreadPoolExecutor(max_workers=TICKER_WORKERS) as executor:
+        futures = {}
+        for ticker in tickers_list:
+            print(f"Fetching data for {ticker}...")
+            futures[ticker] = executor.submit(fetch_options_data, ticker)
+
+    for ticker, future in futures.items():
+        try:
+            raw_data = future.result()
+        except Exception as e:
+            print(f"Warning: Could not fetch data for {ticker}. Error: {e}")
+            continue
         if not raw_data.empty:
             all_raw_data.append(raw_data)
     
@@ -84,12 +115,12 @@ def run_full_pipeline(tickers_list):
         print("No data fetched. Exiting.")
         return
 
-    master_raw_df = pd.concat(all_raw_data)
+    master_raw_df = pd.concat(all_raw_data, ignore_index=True, copy=False, sort=False)
     print("Transforming data into curated table...")
     curated_df = create_curated_table(master_raw_df, r)
     print("Saving data to database...")
-    db.save_to_db(master_raw_df, table_name='raw_options')
-    db.save_to_db(curated_df, table_name='curated_options')
+    db.save_to_db(master_raw_df, table_name='raw_options', key_columns=['ticker', 'fetch_timestamp', 'contractSymbol'])
+    db.save_to_db(curated_df, table_name='curated_options', key_columns=['ticker', 'fetched_at', 'contract_symbol'])
     
     print("Pipeline finished successfully.")
     print(f"\n--- Curated Data Head (from data/options.db) ---")
@@ -1,5 +1,6 @@
 import db_manager as db
 import models as m
+import numpy as np
 import pandas as pd
 
 def run_validation_test():
@@ -9,9 +10,11 @@ def run_validation_test():
     """
     print("--- Running Pricer Validation Test ---")
     query = """
-    SELECT * FROM curated_options 
+    SELECT contract_symbol, type, market_price, S, K, T, r
+    FROM curated_options AS c
     WHERE ticker = 'AAPL' 
       AND type = 'call' 
+      AND fetched_at = (SELECT MAX(fetched_at) FROM curated_options WHERE ticker = c.ticker)
       AND T > (30.0/365.0)
     ORDER BY ABS(S - K) -- Order by "nearness" to money
     LIMIT 1
@@ -34,10 +37,11 @@ def run_validation_test():
         K=option['K'],
         T=option['T'],
         r=option['r'],
-        option_type=option['type']
+        option_type=option['type'],
+        method='jaeckel'
     )
     
-    if iv is None:
+    if np.isnan(iv):
         print("IV solver failed to converge. Exiting.")
         return
 
@@ -0,0 +1,27 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import MARKET_TZ, trading_day
+
+
+@pytest.mark.parametrize('now, expected', [
+    (datetime(2026, 10, 15, 9, 30), '2026-10-15'),   # Thursday, market open
+    (datetime(2026, 10, 15, 15, 59), '2026-10-15'),  # Thursday, just before the close
+    (datetime(2026, 10, 15, 16, 0), '2026-10-16'),   # Thursday close rolls to Friday
+    (datetime(2026, 10, 16, 16, 0), '2026-10-19'),   # Friday close rolls to Monday
+    (datetime(2026, 10, 17, 12, 0), '2026-10-19'),   # Saturday
+    (datetime(2026, 10, 18, 20, 0), '2026-10-19'),   # Sunday evening
+])
+def test_trading_day(now, expected):
+    assert trading_day(now.replace(tzinfo=MARKET_TZ)) == expected
+
+
+def test_trading_day_converts_to_new_york_time():
+    # 20:00 UTC is the 16:00 close in New York during daylight saving time.
+    assert trading_day(datetime(2026, 10, 15, 19, 59, tzinfo=timezone.utc)) == '2026-10-15'
+    assert trading_day(datetime(2026, 10, 15, 20, 0, tzinfo=timezone.utc)) == '2026-10-16'
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import models as m
+
+
+@pytest.mark.parametrize('field', ['S', 'K', 'T', 'r'])
+def test_implied_volatility_nan_input_returns_nan(field):
+    quotes = {
+        'S': np.array([100.0, 100.0]),
+        'K': np.array([100.0, 105.0]),
+        'T': np.array([0.5, 0.5]),
+        'r': np.array([0.04, 0.04]),
+    }
+    market_price = m.bsm_price(**quotes, sigma=0.25, option_type=['call', 'put'])
+    quotes[field][0] = np.nan
+
+    iv = m.implied_volatility(market_price, **quotes, option_type=['call', 'put'])
+
+    assert np.isnan(iv[0])
+    assert iv[1] == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize('method', ['newton', 'jaeckel'])
+def test_implied_volatility_recovers_sigma(method):
+    S = np.full(4, 100.0)
+    K = np.array([80.0, 95.0, 105.0, 120.0])
+    T = np.array([0.1, 0.5, 1.0, 0.0])
+    r = np.full(4, 0.04)
+    option_type = ['put', 'call', 'put', 'call']
+    market_price = m.bsm_price(S, K, np.array([0.1, 0.5, 1.0, 1.0]), r, 0.3, option_type)
+
+    iv = m.implied_volatility(market_price, S, K, T, r, option_type, method=method)
+
+    assert iv[:3] == pytest.approx(0.3, abs=1e-6)
+    assert np.isnan(iv[3])
+
+
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_crr_european_converges_to_bsm(option_type):
+    crr = m.crr_binomial_pricer(100, 95, 0.75, 0.04, 0.3, 5000, option_type, 'european')
+    assert crr == pytest.approx(m.bsm_price(100, 95, 0.75, 0.04, 0.3, option_type), abs=1e-3)
+
+
+def test_crr_american_put_reference_value():
+    crr = m.crr_binomial_pricer(100, 100, 1, 0.05, 0.2, 200, 'put', 'american')
+    assert crr == pytest.approx(6.0863827, abs=1e-7)